@@ -0,0 +1,248 @@
+"""
+Asyncio front-end for NeuraDocPrivacy masking.
+
+Masking is CPU-bound (text extraction, spaCy, redaction), so jobs are run in
+worker processes while the event loop only schedules them.  Jobs are
+dispatched by priority (lower value runs first, FIFO within a priority),
+can be cancelled while queued or running, and may carry a per-job timeout.
+"""
+
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from masking import mask_document
+
+
+class MaskingTimeoutError(asyncio.TimeoutError):
+    """Raised when a job does not finish within its timeout."""
+
+
+def _run_job(conn, pdf_path, output_path, options):
+    # Ayrı bir süreçte çalışır; sonucu ya da hatayı boruya yazar
+    try:
+        try:
+            outcome = (True, mask_document(pdf_path, output_path, **options))
+        except Exception as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception:  # pickle edilemeyen hata
+            conn.send((False, RuntimeError(repr(outcome[1]))))
+    finally:
+        conn.close()
+
+
+def _receive(conn, process):
+    try:
+        ok, value = conn.recv()
+    except EOFError:
+        raise ChildProcessError("Masking worker exited without a result") from None
+    finally:
+        conn.close()
+        process.join()
+    if ok:
+        return value
+    raise value
+
+
+class MaskingJob:
+    """Handle for a submitted masking job.
+
+    Await the job to get its :class:`masking.MaskingResult`; call
+    :meth:`cancel` to drop it from the queue or stop waiting for it.
+    """
+
+    def __init__(self, job_id, pdf_path, output_path, options, priority, timeout, future):
+        self.job_id = job_id
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.options = options
+        self.priority = priority
+        self.timeout = timeout
+        self.future = future
+
+    def cancel(self):
+        return self.future.cancel()
+
+    def cancelled(self):
+        return self.future.cancelled()
+
+    def done(self):
+        return self.future.done()
+
+    def __await__(self):
+        return self.future.__await__()
+
+
+class AsyncMasker:
+    """Run :func:`masking.mask_document` jobs from asyncio code.
+
+    ``max_workers`` bounds how many jobs run at once (default: one per CPU).
+    By default every job runs in its own worker process, so a job that times
+    out or is cancelled while running is killed and its slot is free for the
+    next queued job straight away; a document that hangs cannot block the
+    queue.
+
+    A caller-supplied ``executor`` is used as-is and left open on
+    :meth:`close`.  Executors cannot interrupt a running call, so there a
+    timed-out or cancelled job is resolved immediately but keeps its slot
+    until the document is done; the next job still starts in priority order
+    and its timeout only starts counting once it is actually running.
+
+    Worker processes receive pickled arguments, so documents must be given
+    as paths or bytes and ``output_path``/``audit_log`` as paths; file-like
+    objects and memoryviews are rejected by :meth:`submit`.
+    """
+
+    def __init__(self, max_workers=None, executor=None):
+        self._executor = executor
+        if executor is None:
+            self._max_workers = max_workers or os.cpu_count() or 1
+        else:
+            self._max_workers = max_workers or getattr(executor, '_max_workers', 1)
+        # Her işin sonucunu kendi borusundan bekleyen thread'ler
+        self._waiters = ThreadPoolExecutor(self._max_workers)
+        self._context = multiprocessing.get_context()
+        self._queue = None
+        self._dispatchers = []
+        self._counter = itertools.count()
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._dispatchers = [
+                asyncio.ensure_future(self._dispatch())
+                for _ in range(self._max_workers)
+            ]
+
+    def submit(self, pdf_path, output_path=None, *, priority=0, timeout=None, **options):
+        """Queue a job and return its :class:`MaskingJob` handle.
+
+        ``options`` are forwarded to :func:`masking.mask_document`.  When
+        ``output_path`` is ``None`` the result carries the masked bytes.
+        """
+        if self._closed:
+            raise RuntimeError("AsyncMasker is closed")
+        self._check_picklable(pdf_path, output_path, options)
+        self._ensure_started()
+        seq = next(self._counter)
+        job = MaskingJob(seq, pdf_path, output_path, options, priority, timeout,
+                         asyncio.get_running_loop().create_future())
+        self._queue.put_nowait((priority, seq, job))
+        return job
+
+    def _check_picklable(self, pdf_path, output_path, options):
+        # Süreçlere dosya nesneleri aktarılamaz; pickle hatası yerine açık hata ver
+        if self._executor is not None and not isinstance(self._executor, ProcessPoolExecutor):
+            return
+        if isinstance(pdf_path, memoryview):
+            raise TypeError("pdf_path must be a path or bytes when using worker processes")
+        for name, value in (('output_path', output_path), ('audit_log', options.get('audit_log'))):
+            if value is not None and not isinstance(value, (str, os.PathLike)):
+                raise TypeError(f"{name} must be a path when using worker processes; "
+                                "file-like objects cannot be sent to them")
+
+    async def mask(self, pdf_path, output_path=None, *, priority=0, timeout=None, **options):
+        """Mask a document and return its :class:`masking.MaskingResult`.
+
+        Raises :class:`MaskingTimeoutError` if ``timeout`` seconds elapse
+        once the job has started, and propagates any masking error.
+        Cancelling the awaiting task cancels the job.
+        """
+        job = self.submit(pdf_path, output_path, priority=priority,
+                          timeout=timeout, **options)
+        try:
+            return await job
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    async def _dispatch(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if job is None:
+                    return
+                if not job.done():  # iptal edilmiş işleri atla
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        process = None
+        try:
+            if self._executor is None:
+                process, exec_future = self._start_process(loop, job)
+            else:
+                call = functools.partial(mask_document, job.pdf_path, job.output_path, **job.options)
+                exec_future = loop.run_in_executor(self._executor, call)
+        except Exception as e:  # örn. BrokenProcessPool ya da kapatılmış havuz
+            job.future.set_exception(e)
+            return
+        done, _ = await asyncio.wait({exec_future, job.future}, timeout=job.timeout,
+                                     return_when=asyncio.FIRST_COMPLETED)
+
+        if job.future.done():
+            pass
+        elif exec_future not in done:
+            job.future.set_exception(MaskingTimeoutError(
+                f"Masking {job.pdf_path} exceeded {job.timeout}s"))
+        elif exec_future.cancelled():
+            job.future.cancel()
+        elif exec_future.exception() is not None:
+            job.future.set_exception(exec_future.exception())
+        else:
+            job.future.set_result(exec_future.result())
+
+        if not exec_future.done() and process is not None:
+            # Zaman aşımı ya da iptal: takılan belgeyi işleyen süreci öldür
+            process.kill()
+        # Dış executor'da çalışan iş bitene kadar yuvayı tut; aksi halde sonraki
+        # iş havuzun kendi FIFO kuyruğunda bekler ve öncelik sırası ile
+        # max_workers bozulur
+        if not exec_future.done():
+            await asyncio.wait({exec_future})
+        if not exec_future.cancelled():
+            exec_future.exception()
+
+    def _start_process(self, loop, job):
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_job, args=(writer, job.pdf_path, job.output_path, job.options), daemon=True)
+        try:
+            process.start()
+        except BaseException:
+            reader.close()
+            raise
+        finally:
+            writer.close()
+        return process, loop.run_in_executor(self._waiters, _receive, reader, process)
+
+    async def close(self, cancel_pending=False):
+        """Stop the dispatchers, optionally cancelling queued jobs."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._queue is not None:
+            if cancel_pending:
+                while not self._queue.empty():
+                    _, _, job = self._queue.get_nowait()
+                    job.cancel()
+                    self._queue.task_done()
+            # Sentinel'ler her önceliğin arkasına düşsün
+            for _ in self._dispatchers:
+                self._queue.put_nowait((float('inf'), next(self._counter), None))
+            await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._waiters.shutdown()
@@ -0,0 +1,365 @@
+"""
+Distributed batch masking for NeuraDocPrivacy.
+
+A SQLite database acts as a shared work queue: a coordinator enqueues
+documents, and any number of worker processes - on one host or on several
+hosts that see the same directory - claim jobs, mask them with
+:func:`masking.mask_document` and record the outcome.
+
+Claims are leases: a running worker renews its lease in the background,
+and a job whose worker dies is handed out again once its lease expires.
+Failed jobs are retried up to ``max_attempts`` times.  Output is written to
+a temporary file and renamed into place only while the lease is still held.
+The database must live on a filesystem with working POSIX locks.
+
+Usage::
+
+    python batch_queue.py enqueue jobs.db archive/ --output-dir masked/ --mask-email
+    python batch_queue.py worker jobs.db --processes 8
+    python batch_queue.py status jobs.db
+    python batch_queue.py retry-failed jobs.db
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from masking import mask_document
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    pdf_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    stats TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_output ON jobs (output_path);
+"""
+
+
+class Job:
+    """A claimed unit of work."""
+
+    def __init__(self, job_id, pdf_path, output_path, options, attempts):
+        self.job_id = job_id
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.options = options
+        self.attempts = attempts
+
+
+class JobQueue:
+    """SQLite-backed masking job queue shared by coordinator and workers."""
+
+    def __init__(self, db_path, lease_seconds=3600, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def enqueue(self, pdf_path, output_path, options=None):
+        """Add one document and return its job id."""
+        return self.enqueue_many([(pdf_path, output_path, options)])[0]
+
+    def enqueue_many(self, jobs):
+        """Add ``(pdf_path, output_path, options)`` tuples in one transaction.
+
+        Raises ``ValueError`` if two jobs would write the same output path,
+        within ``jobs`` or against pending or running jobs.  Finished and
+        failed jobs do not block a path, so a backfill can be re-run into
+        the same output directory.
+        """
+        now = time.time()
+        ids = []
+        seen = set()
+        with self._transaction():
+            for pdf_path, output_path, options in jobs:
+                if output_path in seen or self._conn.execute(
+                        "SELECT 1 FROM jobs WHERE output_path = ? AND status IN (?, ?) LIMIT 1",
+                        (output_path, PENDING, RUNNING)).fetchone():
+                    raise ValueError(f"Output path {output_path} is used by more than one job")
+                seen.add(output_path)
+                cursor = self._conn.execute(
+                    "INSERT INTO jobs (pdf_path, output_path, options, updated) VALUES (?, ?, ?, ?)",
+                    (pdf_path, output_path, json.dumps(options or {}), now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def claim(self, worker_id):
+        """Lease the next pending (or abandoned) job, or return ``None``."""
+        now = time.time()
+        with self._transaction():
+            # Süresi dolmuş ve deneme hakkı bitmiş işleri kalıcı olarak başarısız say
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', lease_until = NULL, updated = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, now, self.max_attempts))
+            row = self._conn.execute(
+                "SELECT id, pdf_path, output_path, options, attempts FROM jobs "
+                "WHERE status = ? OR (status = ? AND lease_until < ?) "
+                "ORDER BY id LIMIT 1",
+                (PENDING, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_until = ?, updated = ? "
+                "WHERE id = ?",
+                (RUNNING, worker_id, now + self.lease_seconds, now, row[0]))
+        return Job(row[0], row[1], row[2], json.loads(row[3]), row[4] + 1)
+
+    def renew(self, job, worker_id):
+        """Extend the lease on ``job``; return ``False`` if it was lost."""
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + self.lease_seconds, time.time(), job.job_id, worker_id, RUNNING))
+        return cursor.rowcount == 1
+
+    def complete(self, job, worker_id, stats=None):
+        """Mark ``job`` done; ignored if its lease was taken over."""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stats = ?, error = NULL, lease_until = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, json.dumps(stats) if stats is not None else None, time.time(),
+                 job.job_id, worker_id, RUNNING))
+
+    def fail(self, job, worker_id, error):
+        """Return ``job`` to the queue, or fail it after ``max_attempts``."""
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = ?, lease_until = NULL, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (self.max_attempts, FAILED, PENDING, str(error), time.time(),
+                 job.job_id, worker_id, RUNNING))
+
+    def retry_failed(self):
+        """Return failed jobs to the queue with a fresh attempt count.
+
+        A failed job is skipped if a pending or running job now writes the
+        same output path; of several failed jobs for one path only the
+        newest is retried.  Returns the number of jobs requeued.
+        """
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, worker = NULL, lease_until = NULL, "
+                "error = NULL, updated = ? "
+                "WHERE status = ? "
+                "AND id = (SELECT MAX(id) FROM jobs AS other "
+                "          WHERE other.output_path = jobs.output_path AND other.status = ?) "
+                "AND NOT EXISTS (SELECT 1 FROM jobs AS other "
+                "                WHERE other.output_path = jobs.output_path AND other.status IN (?, ?))",
+                (PENDING, time.time(), FAILED, FAILED, PENDING, RUNNING))
+        return cursor.rowcount
+
+    def progress(self):
+        """Return job counts by status."""
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for status, count in self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return counts
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE yazma kilidini hemen alır; iki işçi aynı işi talep edemez
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __enter__(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class _LeaseHeartbeat(threading.Thread):
+    # Uzun süren belgelerde kira süresi dolup iş ikinci bir işçiye verilmesin
+    def __init__(self, db_path, job, worker_id, lease_seconds):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.job = job
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self._stop_event = threading.Event()
+
+    def run(self):
+        # SQLite bağlantıları thread'ler arasında paylaşılamaz
+        queue = JobQueue(self.db_path, lease_seconds=self.lease_seconds)
+        try:
+            while not self._stop_event.wait(self.lease_seconds / 3):
+                try:
+                    if not queue.renew(self.job, self.worker_id):
+                        return
+                except sqlite3.OperationalError:
+                    # Meşgul veritabanı (örn. "database is locked"); sonraki turda yeniden dene
+                    continue
+        finally:
+            queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(db_path, worker_id=None, poll_interval=1.0, stop_when_empty=True, **queue_options):
+    """Claim and mask jobs until the queue is drained.
+
+    Returns the number of jobs this worker completed.  With
+    ``stop_when_empty=False`` the worker keeps polling for new jobs.
+    """
+    worker_id = worker_id or default_worker_id()
+    queue = JobQueue(db_path, **queue_options)
+    completed = 0
+    try:
+        while True:
+            job = queue.claim(worker_id)
+            if job is None:
+                counts = queue.progress()
+                if stop_when_empty and counts[PENDING] == 0 and counts[RUNNING] == 0:
+                    return completed
+                time.sleep(poll_interval)
+                continue
+
+            tmp_path = f"{job.output_path}.{uuid.uuid4().hex}.tmp"
+            heartbeat = _LeaseHeartbeat(db_path, job, worker_id, queue.lease_seconds)
+            heartbeat.start()
+            try:
+                output_dir = os.path.dirname(job.output_path)
+                if output_dir:
+                    os.makedirs(output_dir, exist_ok=True)
+                result = mask_document(job.pdf_path, tmp_path, **job.options)
+            except Exception as e:
+                heartbeat.stop()
+                queue.fail(job, worker_id, e)
+            else:
+                heartbeat.stop()
+                # Kira başka bir işçiye geçtiyse çıktıyı onun üzerine yazma
+                if queue.renew(job, worker_id):
+                    os.replace(tmp_path, job.output_path)
+                    queue.complete(job, worker_id, result.stats)
+                    completed += 1
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    finally:
+        queue.close()
+
+
+def run_workers(db_path, processes, **worker_options):
+    """Run ``processes`` local workers and wait for all of them."""
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(db_path,), kwargs=worker_options)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+MASK_FLAGS = ('mask_email', 'mask_phone', 'mask_address', 'mask_person', 'mask_gpe',
+              'mask_loc', 'mask_org', 'style_star', 'style_black', 'style_frame')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed batch PDF masking")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help="Add PDFs to the queue")
+    enqueue.add_argument('db')
+    enqueue.add_argument('inputs', nargs='+', help="PDF files or directories")
+    enqueue.add_argument('--output-dir', required=True)
+    for flag in MASK_FLAGS:
+        enqueue.add_argument('--' + flag.replace('_', '-'), dest=flag, action='store_true')
+
+    worker = commands.add_parser('worker', help="Process queued jobs")
+    worker.add_argument('db')
+    worker.add_argument('--processes', type=int, default=1)
+    worker.add_argument('--poll-interval', type=float, default=1.0)
+    worker.add_argument('--keep-running', action='store_true',
+                        help="Keep polling when the queue is empty")
+
+    status = commands.add_parser('status', help="Show queue progress")
+    status.add_argument('db')
+
+    retry = commands.add_parser('retry-failed', help="Return failed jobs to the queue")
+    retry.add_argument('db')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'enqueue':
+        options = {flag: True for flag in MASK_FLAGS if getattr(args, flag)}
+        jobs = []
+        for pdf_path, relative_path in _iter_pdfs(args.inputs):
+            stem, ext = os.path.splitext(relative_path)
+            jobs.append((pdf_path, os.path.join(args.output_dir, f"{stem}_masked{ext}"), options))
+        queue = JobQueue(args.db)
+        try:
+            queue.enqueue_many(jobs)
+        except ValueError as e:
+            parser.error(f"{e}; rename the inputs or enqueue them with different --output-dir values")
+        finally:
+            queue.close()
+        print(f"Enqueued {len(jobs)} documents")
+    elif args.command == 'worker':
+        worker_options = {'poll_interval': args.poll_interval, 'stop_when_empty': not args.keep_running}
+        if args.processes > 1:
+            run_workers(args.db, args.processes, **worker_options)
+        else:
+            run_worker(args.db, **worker_options)
+    elif args.command == 'retry-failed':
+        queue = JobQueue(args.db)
+        print(f"Requeued {queue.retry_failed()} failed jobs")
+        queue.close()
+    else:
+        queue = JobQueue(args.db)
+        print(json.dumps(queue.progress()))
+        queue.close()
+
+
+def _iter_pdfs(inputs):
+    # Dizinlerdeki klasör yapısı çıktı dizininde korunur
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith('.pdf'):
+                        pdf_path = os.path.join(root, name)
+                        yield pdf_path, os.path.relpath(pdf_path, path)
+        else:
+            yield path, os.path.basename(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,26 @@
 import sys
 import fitz  # PyMuPDF
-import re
-import phonenumbers
-import spacy
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QCheckBox, QGroupBox, QFormLayout, QSpacerItem, QSizePolicy, QTabWidget, QScrollArea, QProgressBar, QStackedWidget, QSplitter, QRadioButton)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPropertyAnimation, QRect, QTimer
-from PyQt5.QtGui import QFont, QPalette, QColor, QPixmap, QImage
+                             QCheckBox, QGroupBox, QFormLayout, QSpacerItem, QSizePolicy, QTabWidget, QScrollArea, QProgressBar, QStackedWidget, QSplitter, QRadioButton,
+                             QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QPropertyAnimation, QRect, QTimer, QObject, QRunnable, QThreadPool, QSize
+from PyQt5.QtGui import QFont, QPalette, QColor, QPixmap, QImage, QIcon
 import os
+import shutil
+import threading
 import time
 
-# İngilizce NER modelini yükleme
-try:
-    nlp_en = spacy.load("en_core_web_sm")
-except OSError:
-    import os
-    os.system("python -m spacy download en_core_web_sm")
-    nlp_en = spacy.load("en_core_web_sm")
-
-# Regex kalıpları
-email_regex = re.compile(
-    r'''(?i)\b(?:[a-z0-9!#$%&'*+/=?^_`{|}~-]+
-    (?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*
-    |"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]
-    |\\[\x01-\x09\x0b\x0c\x0e-\x7f])*")
-    @(?:(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+
-    [a-z0-9](?:[a-z0-9-]*[a-z0-9])?|\[
-    (?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?).
-    ){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?|
-    [a-z0-9-]*[a-z0-9]:
-    (?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]
-    |\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])''', re.VERBOSE)
-
-phone_regex = re.compile(
-    r'(\+?\d{1,3}[-.\s]?)?'      # Ülke kodu (isteğe bağlı)
-    r'(\(?\d{3}\)?[-.\s]?)?'    # Alan kodu (isteğe bağlı)
-    r'\d{3}[-.\s]?\d{4}'         # Ana numara
-)
+from masking import mask_document
+
+# Önizleme çözünürlükleri (1.0 = 72 DPI)
+THUMBNAIL_ZOOM = 0.2
+PAGE_ZOOM = 1.0
+# Küçük resim görevleri kısa tutulur ki görüntülenen sayfa beklemesin
+THUMBNAIL_BATCH = 4
+PAGE_RENDER_PRIORITY = 1
+# PyMuPDF çoklu thread kullanımını desteklemez; GUI dışındaki tüm çağrılar bu kilitle sıralanır
+FITZ_LOCK = threading.Lock()
 
 class MaskingThread(QThread):
     finished = pyqtSignal(str)
@@ -47,11 +30,77 @@ class MaskingThread(QThread):
         self.pdf_path = pdf_path
         self.output_path = output_path
         self.options = options
+        self.result = None
 
     def run(self):
-        mask_sensitive_information(self.pdf_path, self.output_path, **self.options)
+        with FITZ_LOCK:
+            self.result = mask_sensitive_information(self.pdf_path, self.output_path, **self.options)
         self.finished.emit(self.output_path)
 
+class RenderSignals(QObject):
+    # (hedef, sayfa sayısı)
+    opened = pyqtSignal(object, int)
+    # (hedef, sayfa numarası, görüntü)
+    rendered = pyqtSignal(object, int, QImage)
+
+class PageCountTask(QRunnable):
+    """Open a PDF off the GUI thread and report its page count.
+
+    Runs under ``FITZ_LOCK`` like every other PyMuPDF call, so the GUI stays
+    responsive while a masking job holds the lock.
+    """
+
+    def __init__(self, pdf_path, target, signals, cancelled):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.target = target
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        with FITZ_LOCK:
+            doc = fitz.open(self.pdf_path)
+            page_count = len(doc)
+            doc.close()
+        self.signals.opened.emit(self.target, page_count)
+
+class PageRenderTask(QRunnable):
+    """Render pages of a PDF off the GUI thread.
+
+    PyMuPDF is not thread-safe, so the whole task runs under ``FITZ_LOCK``
+    and the render pool uses a single thread.  Once ``cancelled`` is set
+    (the preview was replaced) the task stops before rendering its next
+    page.
+    """
+
+    def __init__(self, pdf_path, page_nums, zoom, target, signals, cancelled):
+        super().__init__()
+        self.pdf_path = pdf_path
+        self.page_nums = page_nums
+        self.zoom = zoom
+        self.target = target
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        with FITZ_LOCK:
+            doc = fitz.open(self.pdf_path)
+            try:
+                matrix = fitz.Matrix(self.zoom, self.zoom)
+                for page_num in self.page_nums:
+                    if self.cancelled.is_set():
+                        return
+                    pix = doc.load_page(page_num).get_pixmap(matrix=matrix)
+                    # QImage pix tamponunu paylaşır; thread'den çıkmadan kopyala
+                    image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).copy()
+                    self.signals.rendered.emit(self.target, page_num, image)
+            finally:
+                doc.close()
+
 class PDFMaskApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -190,7 +239,32 @@ class PDFMaskApp(QMainWindow):
         self.preview_tabs.addTab(self.original_preview, "Original PDF")
         self.preview_tabs.addTab(self.masked_preview, "Masked PDF")
         
-        preview_layout.addWidget(self.preview_tabs)
+        # Her sekme için küçük resim şeridi
+        self.thumbnail_stack = QStackedWidget()
+        self.thumbnail_stack.setFixedWidth(140)
+        self.thumbnail_strips = {}
+        for stacked_widget in (self.original_preview, self.masked_preview):
+            strip = QListWidget()
+            strip.setIconSize(QSize(100, 130))
+            strip.currentRowChanged.connect(stacked_widget.setCurrentIndex)
+            stacked_widget.currentChanged.connect(lambda index, s=stacked_widget: self.on_preview_page_changed(s, index))
+            self.thumbnail_strips[stacked_widget] = strip
+            self.thumbnail_stack.addWidget(strip)
+        self.preview_tabs.currentChanged.connect(self.thumbnail_stack.setCurrentIndex)
+        
+        # Arka planda sayfa çizimi; PyMuPDF için tek thread yeterli ve güvenli
+        self.render_pool = QThreadPool(self)
+        self.render_pool.setMaxThreadCount(1)
+        self.render_signals = RenderSignals()
+        self.render_signals.opened.connect(self.on_preview_opened)
+        self.render_signals.rendered.connect(self.on_page_rendered)
+        self.previews = {}
+        self.preview_generation = 0
+        
+        preview_row = QHBoxLayout()
+        preview_row.addWidget(self.thumbnail_stack)
+        preview_row.addWidget(self.preview_tabs)
+        preview_layout.addLayout(preview_row)
         self.splitter.addWidget(preview_widget)
         
         # Sidebar için maksimum genişlik ayarlama
@@ -253,8 +327,12 @@ class PDFMaskApp(QMainWindow):
         # PDF dosya yolunu sakla
         pdf_path = output_path  # Çıktı dosya yolunu kullanıyoruz
         
+        # Redaksiyon olmayan sayfalar orijinalin çizimini kullanır
+        result = self.masking_thread.result
+        redacted_pages = {match.page for match in result.matches} if result is not None else None
+        
         # PDF önizlemesini göster
-        self.show_pdf_preview(pdf_path, self.masked_preview)
+        self.show_pdf_preview(pdf_path, self.masked_preview, redacted_pages, self.masking_thread.pdf_path)
         
         # Sol kısmı küçültme animasyonu
         animation = QPropertyAnimation(self.sidebar_widget, b"maximumWidth")
@@ -266,8 +344,22 @@ class PDFMaskApp(QMainWindow):
         # Maskeleme tamamlandı mesajı göster
         self.pdf_path_label.setText("Maskeleme Tamamlandı")
     
-    def show_pdf_preview(self, pdf_path, stacked_widget):
-        doc = fitz.open(pdf_path)
+    def show_pdf_preview(self, pdf_path, stacked_widget, redacted_pages=None, source_path=None):
+        """Lay out ``pdf_path`` in ``stacked_widget`` and render it progressively.
+
+        Low-resolution thumbnails are rendered in the background and shown as
+        placeholders; only the page being viewed is rendered at full
+        resolution, ahead of any queued thumbnails.  When ``redacted_pages``
+        is given and the Original tab still shows ``source_path``, all other
+        pages reuse the original document's renders.  The document is opened
+        in the render pool and laid out once its page count is known.
+        """
+        # Eski çizimleri durdur ve sonuçlarını yok saymak için yeni bir nesil başlat
+        old_state = self.previews.pop(stacked_widget, None)
+        if old_state is not None:
+            old_state['cancelled'].set()
+        self.preview_generation += 1
+        self.thumbnail_strips[stacked_widget].clear()
         
         # Clear all widgets from the stacked widget
         while stacked_widget.count() > 0:
@@ -275,24 +367,115 @@ class PDFMaskApp(QMainWindow):
             stacked_widget.removeWidget(widget)
             widget.deleteLater()
         
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap()
-            image = QImage(pix.samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(image)
+        cancelled = threading.Event()
+        self.previews[stacked_widget] = {
+            'path': pdf_path,
+            'generation': self.preview_generation,
+            'thumbs': {},
+            'pages': {},
+            'requested': set(),
+            'redacted': redacted_pages,
+            'source_path': source_path,
+            'reused': set(),
+            'source': None,
+            'cancelled': cancelled,
+        }
+        
+        # Sayfa sayısı da arka planda okunur; maskeleme FITZ_LOCK'u tutarken GUI donmasın
+        target = (stacked_widget, self.preview_generation, None)
+        self.render_pool.start(PageCountTask(pdf_path, target, self.render_signals, cancelled), PAGE_RENDER_PRIORITY)
+
+    def on_preview_opened(self, target, page_count):
+        stacked_widget, generation, _ = target
+        state = self.previews.get(stacked_widget)
+        if state is None or state['generation'] != generation:
+            return
+        
+        redacted_pages = state['redacted']
+        reused = set(range(page_count)) - set(redacted_pages) if redacted_pages is not None else set()
+        # Maskeleme sırasında başka bir PDF seçildiyse orijinalin çizimleri kullanılamaz
+        source = self.previews.get(self.original_preview) if reused else None
+        if source is not None and source['path'] != state['source_path']:
+            source = None
+        state['reused'] = reused
+        state['source'] = source
+        
+        strip = self.thumbnail_strips[stacked_widget]
+        for page_num in range(page_count):
+            strip.addItem(QListWidgetItem(str(page_num + 1)))
             
             page_label = QLabel()
-            page_label.setPixmap(pixmap.scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
             page_label.setAlignment(Qt.AlignCenter)  # Ortala
             
             scroll_area = QScrollArea()
             scroll_area.setWidget(page_label)
             scroll_area.setWidgetResizable(True)
-            scroll_area.verticalScrollBar().valueChanged.connect(lambda: self.show_page_number(page_num + 1))
+            scroll_area.verticalScrollBar().valueChanged.connect(lambda _, n=page_num + 1: self.show_page_number(n))
             
             stacked_widget.addWidget(scroll_area)
         
-        doc.close()
+        pending = []
+        for page_num in range(page_count):
+            if page_num in reused and source is not None and page_num in source['thumbs']:
+                self._set_thumbnail(stacked_widget, page_num, source['thumbs'][page_num])
+            else:
+                pending.append(page_num)
+        
+        # Küçük resimleri küçük gruplar halinde dağıt
+        target = (stacked_widget, generation, True)
+        for i in range(0, len(pending), THUMBNAIL_BATCH):
+            chunk = pending[i:i + THUMBNAIL_BATCH]
+            self.render_pool.start(PageRenderTask(state['path'], chunk, THUMBNAIL_ZOOM, target, self.render_signals, state['cancelled']))
+        
+        self.request_page_render(stacked_widget, stacked_widget.currentIndex())
+
+    def request_page_render(self, stacked_widget, page_num):
+        state = self.previews.get(stacked_widget)
+        if state is None or page_num < 0 or page_num in state['requested']:
+            return
+        state['requested'].add(page_num)
+        
+        source = state['source']
+        if page_num in state['reused'] and source is not None and page_num in source['pages']:
+            self._set_page_image(stacked_widget, page_num, source['pages'][page_num])
+            return
+        
+        target = (stacked_widget, state['generation'], False)
+        task = PageRenderTask(state['path'], [page_num], PAGE_ZOOM, target, self.render_signals, state['cancelled'])
+        self.render_pool.start(task, PAGE_RENDER_PRIORITY)
+
+    def on_page_rendered(self, target, page_num, image):
+        stacked_widget, generation, is_thumbnail = target
+        state = self.previews.get(stacked_widget)
+        if state is None or state['generation'] != generation:
+            return
+        if is_thumbnail:
+            self._set_thumbnail(stacked_widget, page_num, image)
+        else:
+            self._set_page_image(stacked_widget, page_num, image)
+
+    def on_preview_page_changed(self, stacked_widget, index):
+        strip = self.thumbnail_strips[stacked_widget]
+        strip.blockSignals(True)
+        strip.setCurrentRow(index)
+        strip.blockSignals(False)
+        self.request_page_render(stacked_widget, index)
+
+    def _set_thumbnail(self, stacked_widget, page_num, image):
+        state = self.previews[stacked_widget]
+        state['thumbs'][page_num] = image
+        self.thumbnail_strips[stacked_widget].item(page_num).setIcon(QIcon(QPixmap.fromImage(image)))
+        # Tam çözünürlük gelene kadar düşük çözünürlüklü önizleme göster
+        if page_num not in state['pages']:
+            self._show_page_image(stacked_widget, page_num, image)
+
+    def _set_page_image(self, stacked_widget, page_num, image):
+        self.previews[stacked_widget]['pages'][page_num] = image
+        self._show_page_image(stacked_widget, page_num, image)
+
+    def _show_page_image(self, stacked_widget, page_num, image):
+        page_label = stacked_widget.widget(page_num).widget()
+        page_label.setPixmap(QPixmap.fromImage(image).scaled(self.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
 
     def show_page_number(self, page_number):
         self.page_number_label.setText(f"Page {page_number}")
@@ -310,9 +493,7 @@ class PDFMaskApp(QMainWindow):
             save_path, _ = QFileDialog.getSaveFileName(self, "Save PDF", file_path, "PDF Files (*.pdf)")
             if save_path:
                 try:
-                    with open(file_path, 'rb') as f_src:
-                        with open(save_path, 'wb') as f_dst:
-                            f_dst.write(f_src.read())
+                    shutil.copyfile(file_path, save_path)
                     print(f"File successfully saved to {save_path}")
                 except Exception as e:
                     print(f"Error saving file: {e}")
@@ -327,93 +508,16 @@ class PDFMaskApp(QMainWindow):
         # PDF üzerinde metin vurgulama işlemi
         pass
 
-def mask_sensitive_information(pdf_path, output_path, mask_email=False, mask_phone=False, mask_address=False, mask_person=False, mask_gpe=False, mask_loc=False, mask_org=False, style_star=False, style_black=False, style_frame=False):
+def mask_sensitive_information(pdf_path, output_path, **options):
+    """Blocking, GUI-friendly wrapper around :func:`mask_document`.
+
+    Errors are reported and swallowed; on success the
+    :class:`masking.MaskingResult` is returned.
+    """
     try:
-        doc = fitz.open(pdf_path)
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            blocks = page.get_text("dict")["blocks"]
-            
-            redaction_areas = []
-            
-            for block in blocks:
-                if block['type'] != 0:
-                    continue
-                
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        span_text = span["text"]
-                        span_bbox = span["bbox"]
-                        
-                        if mask_email:
-                            for match in email_regex.finditer(span_text):
-                                match_start, match_end = match.span()
-                                char_width = (span_bbox[2] - span_bbox[0]) / len(span_text)
-                                match_x0 = span_bbox[0] + match_start * char_width
-                                match_x1 = span_bbox[0] + match_end * char_width
-                                match_rect = fitz.Rect(match_x0, span_bbox[1], match_x1, span_bbox[3])
-                                redaction_areas.append((match_rect, match_end - match_start))
-                        
-                        if mask_phone:
-                            for match in phonenumbers.PhoneNumberMatcher(span_text, None):
-                                match_start, match_end = match.start, match.end
-                                if phonenumbers.is_valid_number(match.number):
-                                    char_width = (span_bbox[2] - span_bbox[0]) / len(span_text)
-                                    match_x0 = span_bbox[0] + match_start * char_width
-                                    match_x1 = span_bbox[0] + match_end * char_width
-                                    match_rect = fitz.Rect(match_x0, span_bbox[1], match_x1, span_bbox[3])
-                                    redaction_areas.append((match_rect, match_end - match_start))
-                        
-                        if mask_address or mask_person or mask_gpe or mask_loc or mask_org:
-                            doc_spacy = nlp_en(span_text)
-                            for ent in doc_spacy.ents:
-                                if ((mask_person and ent.label_ == 'PERSON') or
-                                    (mask_gpe and ent.label_ == 'GPE') or
-                                    (mask_loc and ent.label_ == 'LOC') or
-                                    (mask_org and ent.label_ == 'ORG')):
-                                    ent_start, ent_end = ent.start_char, ent.end_char
-                                    if ent_end - ent_start > 1:
-                                        char_width = (span_bbox[2] - span_bbox[0]) / len(span_text)
-                                        ent_x0 = span_bbox[0] + ent_start * char_width
-                                        ent_x1 = span_bbox[0] + ent_end * char_width
-                                        ent_rect = fitz.Rect(ent_x0, span_bbox[1], ent_x1, span_bbox[3])
-                                        redaction_areas.append((ent_rect, ent_end - ent_start))
-            
-            for rect, length in redaction_areas:
-                # Redaksiyon annotasyonu ekle
-                if style_black:  # Siyah dolgu ile maskeleme
-                    page.add_redact_annot(rect, fill=(0, 0, 0))  # Siyah dolgu rengi
-                elif style_frame:  # Çerçeve ile maskeleme
-                    page.draw_rect(rect, color=(1, 0, 0), width=1)  # Kırmızı çerçeve
-                elif style_star:  # Yıldız ile maskeleme
-                    # Yıldız sayısını belirle (yaklaşık olarak)
-                    rect_width = rect.width
-                    num_stars = max(int(rect_width / 10), 1)  # 10 piksel başına 1 yıldız
-                    masked_text = '*' * num_stars
-                    
-                    # Yıldızları eklemek için uygun pozisyon
-                    insert_x = rect.x0
-                    insert_y = rect.y1 - (rect.height * 0.2)  # Y pozisyonunu ayarlayın
-                    
-                    # Orijinal metni gizle
-                    page.add_redact_annot(rect, fill=(0, 0, 0))  # Siyah dolgu rengi
-                    # Yıldızları ekle
-                    page.insert_text(
-                        fitz.Point(insert_x, insert_y),
-                        masked_text,
-                        fontsize=12,  # Orijinal metnin boyutuna göre ayarlayın
-                        fontname="helv",  # Helvetica fontunu kullanıyoruz
-                        color=(0, 0, 0),
-                        overlay=True
-                    )
-
-            # Redaksiyonları uygula
-            page.apply_redactions()
-        
-        doc.save(output_path)
+        result = mask_document(pdf_path, output_path, **options)
         print(f"Document saved to {output_path}")
-        doc.close()
+        return result
     except Exception as e:
         print(f"Error during masking: {e}")
 
@@ -0,0 +1,344 @@
+"""
+Core detection and masking for NeuraDocPrivacy.
+
+Everything here works without a GUI: the PyQt5 application in ``main.py``,
+the asyncio API, the batch queue and the text cache all build on
+:func:`mask_document` and :func:`detect_document`.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import phonenumbers
+
+# Regex kalıpları
+email_regex = re.compile(
+    r'''(?i)\b(?:[a-z0-9!#$%&'*+/=?^_`{|}~-]+
+    (?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*
+    |"(?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21\x23-\x5b\x5d-\x7f]
+    |\\[\x01-\x09\x0b\x0c\x0e-\x7f])*")
+    @(?:(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+
+    [a-z0-9](?:[a-z0-9-]*[a-z0-9])?|\[
+    (?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?).
+    ){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?|
+    [a-z0-9-]*[a-z0-9]:
+    (?:[\x01-\x08\x0b\x0c\x0e-\x1f\x21-\x5a\x53-\x7f]
+    |\\[\x01-\x09\x0b\x0c\x0e-\x7f])+)\])''', re.VERBOSE)
+
+phone_regex = re.compile(
+    r'(\+?\d{1,3}[-.\s]?)?'      # Ülke kodu (isteğe bağlı)
+    r'(\(?\d{3}\)?[-.\s]?)?'    # Alan kodu (isteğe bağlı)
+    r'\d{3}[-.\s]?\d{4}'         # Ana numara
+)
+
+_nlp_en = None
+
+
+def _load_nlp():
+    # İngilizce NER modeli yalnızca ilk varlık taramasında yüklenir
+    global _nlp_en
+    if _nlp_en is None:
+        import spacy
+        try:
+            _nlp_en = spacy.load("en_core_web_sm")
+        except OSError:
+            os.system("python -m spacy download en_core_web_sm")
+            _nlp_en = spacy.load("en_core_web_sm")
+    return _nlp_en
+
+
+@dataclass
+class MaskMatch:
+    """A single detected region on a page."""
+    page: int
+    entity: str
+    rect: Tuple[float, float, float, float]
+    detector: str
+    value_hash: Optional[str] = None
+
+
+@dataclass
+class MaskingResult:
+    """Structured outcome of a masking run."""
+    matches: List[MaskMatch] = field(default_factory=list)
+    stats: Dict[str, Any] = field(default_factory=dict)
+    output_path: Optional[str] = None
+    output_bytes: Optional[bytes] = None
+
+
+@dataclass
+class DetectionResult:
+    """Outcome of a detection-only pass; the document is never modified."""
+    matches: List[MaskMatch] = field(default_factory=list)
+    pages: List[Dict[str, Any]] = field(default_factory=list)
+    stats: Dict[str, Any] = field(default_factory=dict)
+    stopped_early: bool = False
+
+
+def _open_document(source):
+    # Bellekteki belgeleri geçici dosya olmadan doğrudan aç
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def _hash_value(value, key):
+    # Düz metin asla saklanmaz; anahtarsız özet düşük entropili değerlerde
+    # (telefon, TC no, e-posta) deneme yoluyla geri çözülebilir, bu yüzden HMAC
+    return hmac.new(key, value.encode('utf-8'), hashlib.sha256).hexdigest()[:32]
+
+
+def _document_id(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return 'sha256:' + hashlib.sha256(source).hexdigest()
+    return os.fspath(source)
+
+
+def _span_match(page_num, entity, detector, span_bbox, span_text, start, end, hash_key=None):
+    # Karakter genişliğini span boyunca sabit kabul ederek dikdörtgeni hesapla
+    char_width = (span_bbox[2] - span_bbox[0]) / len(span_text)
+    x0 = span_bbox[0] + start * char_width
+    x1 = span_bbox[0] + end * char_width
+    value_hash = _hash_value(span_text[start:end], hash_key) if hash_key is not None else None
+    return MaskMatch(page_num, entity, (x0, span_bbox[1], x1, span_bbox[3]), detector, value_hash)
+
+
+def page_spans(page):
+    """Yield ``(text, bbox)`` for each text span on ``page``."""
+    blocks = page.get_text("dict")["blocks"]
+    for block in blocks:
+        if block['type'] != 0:
+            continue
+        
+        for line in block["lines"]:
+            for span in line["spans"]:
+                yield span["text"], span["bbox"]
+
+
+def _detect_spans(spans, page_num, mask_email=False, mask_phone=False, mask_address=False, mask_person=False, mask_gpe=False, mask_loc=False, mask_org=False, hash_key=None):
+    # Eşleşmeleri bulundukça üret; erken durdurma için tembel çalışır
+    for span_text, span_bbox in spans:
+        if mask_email:
+            for match in email_regex.finditer(span_text):
+                match_start, match_end = match.span()
+                yield _span_match(page_num, 'EMAIL', 'regex', span_bbox, span_text, match_start, match_end, hash_key)
+        
+        if mask_phone:
+            for match in phonenumbers.PhoneNumberMatcher(span_text, None):
+                match_start, match_end = match.start, match.end
+                if phonenumbers.is_valid_number(match.number):
+                    yield _span_match(page_num, 'PHONE', 'phonenumbers', span_bbox, span_text, match_start, match_end, hash_key)
+        
+        if mask_address or mask_person or mask_gpe or mask_loc or mask_org:
+            doc_spacy = _load_nlp()(span_text)
+            for ent in doc_spacy.ents:
+                if ((mask_person and ent.label_ == 'PERSON') or
+                    (mask_gpe and ent.label_ == 'GPE') or
+                    (mask_loc and ent.label_ == 'LOC') or
+                    (mask_org and ent.label_ == 'ORG')):
+                    ent_start, ent_end = ent.start_char, ent.end_char
+                    if ent_end - ent_start > 1:
+                        yield _span_match(page_num, ent.label_, 'spacy', span_bbox, span_text, ent_start, ent_end, hash_key)
+
+
+def _masking_action(style_star, style_black, style_frame):
+    # mask_document içindeki stil önceliğiyle aynı sırada olmalı
+    if style_black:
+        return 'blackout'
+    if style_frame:
+        return 'frame'
+    if style_star:
+        return 'star'
+    return 'none'
+
+
+def _audit_record(document_id, match, action):
+    return json.dumps({
+        'doc': document_id,
+        'page': match.page,
+        'entity': match.entity,
+        'rect': [round(v, 2) for v in match.rect],
+        'detector': match.detector,
+        'hash': match.value_hash,
+        'action': action,
+    }, separators=(',', ':'))
+
+
+def _write_audit(audit_log, lines):
+    # Tek yazma çağrısı; paylaşılan dosyada belgeler birbirine karışmaz
+    if isinstance(audit_log, (str, os.PathLike)):
+        with open(audit_log, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+    else:
+        audit_log.write(''.join(lines))
+
+
+def mask_document(pdf_path, output_path=None, mask_email=False, mask_phone=False, mask_address=False, mask_person=False, mask_gpe=False, mask_loc=False, mask_org=False, style_star=False, style_black=False, style_frame=False, save_options=None, audit_log=None, audit_key=None, text_cache=None):
+    """Mask ``pdf_path`` and return a :class:`MaskingResult`.
+
+    Unlike :func:`mask_sensitive_information` errors are raised to the caller.
+
+    ``pdf_path`` may be a file path or the document itself as ``bytes``,
+    ``bytearray`` or ``memoryview``.  ``output_path`` may be a file path or a
+    writable binary file-like object; when it is ``None`` the masked document
+    is returned in ``MaskingResult.output_bytes`` instead.  No temporary files
+    are created either way.
+
+    ``save_options`` are passed to PyMuPDF's ``Document.save``/``tobytes``
+    (e.g. ``garbage=3, deflate=True`` for smaller output at the cost of
+    save time).
+
+    ``audit_log`` may be a path (appended to) or a writable text stream.  One
+    JSON line per match is collected while pages are processed and written
+    only after the masked document has been saved, holding the document id,
+    page, entity, rectangle, detector, a truncated HMAC-SHA-256 of the matched
+    value keyed with ``audit_key`` and the applied ``action``.  ``blackout``
+    and ``star`` remove the text; ``frame`` and ``none`` (no style selected)
+    leave it in the output.  ``audit_key`` (``bytes``) is required with
+    ``audit_log`` and must be stored apart from the log: an unkeyed hash of
+    a phone number or e-mail address can be reversed by hashing candidates.
+
+    ``text_cache`` is an optional :class:`text_cache.PageTextCache`; page
+    spans are then read from its memory-mapped index instead of being
+    extracted again.
+    """
+    if audit_log is not None and audit_key is None:
+        raise ValueError("audit_key is required when audit_log is given")
+    started = time.perf_counter()
+    save_options = save_options or {}
+    is_path = isinstance(output_path, (str, os.PathLike))
+    result = MaskingResult(output_path=output_path if is_path else None)
+    entity_counts = {}
+
+    document_id = _document_id(pdf_path) if audit_log is not None else None
+    action = _masking_action(style_star, style_black, style_frame)
+    audit_lines = []
+
+    doc = _open_document(pdf_path)
+    cached = None
+    try:
+        if text_cache is not None:
+            cached = text_cache.open(pdf_path, doc)
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            spans = cached.page_spans(page_num) if cached is not None else page_spans(page)
+            redaction_areas = list(_detect_spans(spans, page_num, mask_email, mask_phone, mask_address, mask_person, mask_gpe, mask_loc, mask_org, audit_key))
+            
+            for area in redaction_areas:
+                rect = fitz.Rect(area.rect)
+                entity_counts[area.entity] = entity_counts.get(area.entity, 0) + 1
+                # Redaksiyon annotasyonu ekle
+                if style_black:  # Siyah dolgu ile maskeleme
+                    page.add_redact_annot(rect, fill=(0, 0, 0))  # Siyah dolgu rengi
+                elif style_frame:  # Çerçeve ile maskeleme
+                    page.draw_rect(rect, color=(1, 0, 0), width=1)  # Kırmızı çerçeve
+                elif style_star:  # Yıldız ile maskeleme
+                    # Yıldız sayısını belirle (yaklaşık olarak)
+                    rect_width = rect.width
+                    num_stars = max(int(rect_width / 10), 1)  # 10 piksel başına 1 yıldız
+                    masked_text = '*' * num_stars
+                    
+                    # Yıldızları eklemek için uygun pozisyon
+                    insert_x = rect.x0
+                    insert_y = rect.y1 - (rect.height * 0.2)  # Y pozisyonunu ayarlayın
+                    
+                    # Orijinal metni gizle
+                    page.add_redact_annot(rect, fill=(0, 0, 0))  # Siyah dolgu rengi
+                    # Yıldızları ekle
+                    page.insert_text(
+                        fitz.Point(insert_x, insert_y),
+                        masked_text,
+                        fontsize=12,  # Orijinal metnin boyutuna göre ayarlayın
+                        fontname="helv",  # Helvetica fontunu kullanıyoruz
+                        color=(0, 0, 0),
+                        overlay=True
+                    )
+
+            # Redaksiyonları uygula
+            page.apply_redactions()
+            result.matches.extend(redaction_areas)
+            if audit_log is not None:
+                audit_lines.extend(_audit_record(document_id, area, action) + '\n' for area in redaction_areas)
+        
+        if output_path is None:
+            result.output_bytes = doc.tobytes(**save_options)
+        else:
+            doc.save(output_path, **save_options)
+        # Denetim kaydı yalnızca belge başarıyla kaydedildikten sonra yazılır
+        if audit_log is not None and audit_lines:
+            _write_audit(audit_log, audit_lines)
+        result.stats = {
+            'pages': len(doc),
+            'matches': len(result.matches),
+            'entities': entity_counts,
+            'elapsed': time.perf_counter() - started,
+        }
+    finally:
+        doc.close()
+        if cached is not None:
+            cached.close()
+    return result
+
+def _threshold_reached(stop_after, entity_counts, total):
+    if stop_after is None:
+        return False
+    if isinstance(stop_after, int):
+        return total >= stop_after
+    return any(entity_counts.get(entity, 0) >= count for entity, count in stop_after.items())
+
+
+def detect_document(pdf_path, mask_email=False, mask_phone=False, mask_address=False, mask_person=False, mask_gpe=False, mask_loc=False, mask_org=False, stop_after=None, hash_key=None, text_cache=None):
+    """Find sensitive information without redacting or saving anything.
+
+    Takes the same source types and detection flags as :func:`mask_document`
+    and returns a :class:`DetectionResult` with per-page entity counts.
+
+    ``stop_after`` ends the scan as soon as it is satisfied: an ``int`` is a
+    total match count, a dict maps entity labels to counts and stops when any
+    of them is reached (``{'PERSON': 1}`` means "any PERSON found").
+
+    ``MaskMatch.value_hash`` is only filled in when ``hash_key`` bytes are
+    given, using the same keyed hash as the audit log.  ``text_cache`` works
+    as in :func:`mask_document`.
+    """
+    started = time.perf_counter()
+    result = DetectionResult()
+    entity_counts = {}
+
+    doc = _open_document(pdf_path)
+    cached = None
+    try:
+        if text_cache is not None:
+            cached = text_cache.open(pdf_path, doc)
+        for page_num in range(len(doc)):
+            page_counts = {}
+            result.pages.append({'page': page_num, 'entities': page_counts})
+            spans = cached.page_spans(page_num) if cached is not None else page_spans(doc[page_num])
+            for match in _detect_spans(spans, page_num, mask_email, mask_phone, mask_address, mask_person, mask_gpe, mask_loc, mask_org, hash_key):
+                result.matches.append(match)
+                page_counts[match.entity] = page_counts.get(match.entity, 0) + 1
+                entity_counts[match.entity] = entity_counts.get(match.entity, 0) + 1
+                if _threshold_reached(stop_after, entity_counts, len(result.matches)):
+                    result.stopped_early = True
+                    break
+            if result.stopped_early:
+                break
+        result.stats = {
+            'pages': len(doc),
+            'pages_scanned': len(result.pages),
+            'matches': len(result.matches),
+            'entities': entity_counts,
+            'elapsed': time.perf_counter() - started,
+        }
+    finally:
+        doc.close()
+        if cached is not None:
+            cached.close()
+    return result
@@ -0,0 +1,156 @@
+"""
+Tests for the asyncio masking API
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masking import MaskingResult
+from async_masker import AsyncMasker, MaskingTimeoutError
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def hang_or_mask(pdf_path, output_path, **options):
+    if pdf_path == 'hang.pdf':
+        while True:
+            time.sleep(1)
+    return MaskingResult(output_bytes=b'%PDF')
+
+
+class TestAsyncMasker:
+    """Test cases for AsyncMasker scheduling behaviour"""
+
+    def test_mask_returns_structured_result(self):
+        """mask() forwards options and returns the MaskingResult"""
+        async def scenario():
+            with patch('async_masker.mask_document',
+                       return_value=MaskingResult(output_bytes=b'%PDF')) as mock_mask:
+                async with AsyncMasker(executor=ThreadPoolExecutor(1)) as masker:
+                    result = await masker.mask('in.pdf', mask_email=True)
+            mock_mask.assert_called_once_with('in.pdf', None, mask_email=True)
+            return result
+
+        assert run(scenario()).output_bytes == b'%PDF'
+
+    def test_errors_are_propagated(self):
+        """Masking errors surface to the awaiting caller"""
+        async def scenario():
+            with patch('async_masker.mask_document', side_effect=FileNotFoundError('x')):
+                async with AsyncMasker(executor=ThreadPoolExecutor(1)) as masker:
+                    await masker.mask('missing.pdf')
+
+        with pytest.raises(FileNotFoundError):
+            run(scenario())
+
+    def test_timeout(self):
+        """Jobs exceeding their timeout raise MaskingTimeoutError"""
+        async def scenario():
+            with patch('async_masker.mask_document', side_effect=lambda *a, **k: time.sleep(0.5)):
+                async with AsyncMasker(executor=ThreadPoolExecutor(1)) as masker:
+                    await masker.mask('slow.pdf', timeout=0.05)
+
+        with pytest.raises(MaskingTimeoutError):
+            run(scenario())
+
+    def test_priority_and_cancellation(self):
+        """Queued jobs run by priority and cancelled jobs never run"""
+        order = []
+        gate = threading.Event()
+
+        def fake_mask(pdf_path, output_path, **options):
+            if pdf_path == 'blocker.pdf':
+                gate.wait(1)
+            order.append(pdf_path)
+            return MaskingResult()
+
+        async def scenario():
+            with patch('async_masker.mask_document', side_effect=fake_mask):
+                async with AsyncMasker(max_workers=1, executor=ThreadPoolExecutor(1)) as masker:
+                    blocker = masker.submit('blocker.pdf')
+                    await asyncio.sleep(0.01)
+                    low = masker.submit('low.pdf', priority=10)
+                    dropped = masker.submit('dropped.pdf', priority=5)
+                    high = masker.submit('high.pdf', priority=0)
+                    dropped.cancel()
+                    gate.set()
+                    await asyncio.gather(blocker, low, high)
+                    assert dropped.cancelled()
+
+        run(scenario())
+        assert order == ['blocker.pdf', 'high.pdf', 'low.pdf']
+
+    def test_submit_failure_resolves_job(self):
+        """An executor that refuses work fails the job instead of hanging"""
+        class BrokenExecutor(ThreadPoolExecutor):
+            def submit(self, *args, **kwargs):
+                raise RuntimeError("pool is broken")
+
+        async def scenario():
+            async with AsyncMasker(max_workers=1, executor=BrokenExecutor(1)) as masker:
+                for _ in range(2):
+                    with pytest.raises(RuntimeError):
+                        await asyncio.wait_for(masker.mask('in.pdf'), 1)
+
+        run(scenario())
+
+    def test_timeout_starts_when_job_runs(self):
+        """A job queued behind a timed-out job gets its full timeout"""
+        def fake_mask(pdf_path, output_path, **options):
+            time.sleep(0.5 if pdf_path == 'slow.pdf' else 0.05)
+            return MaskingResult()
+
+        async def scenario():
+            with patch('async_masker.mask_document', side_effect=fake_mask):
+                async with AsyncMasker(max_workers=1, executor=ThreadPoolExecutor(1)) as masker:
+                    slow = masker.submit('slow.pdf', timeout=0.05)
+                    fast = masker.submit('fast.pdf', timeout=0.2)
+                    with pytest.raises(MaskingTimeoutError):
+                        await slow
+                    return await fast
+
+        assert isinstance(run(scenario()), MaskingResult)
+
+    def test_process_pool_rejects_file_objects(self):
+        """File-like outputs cannot be sent to a process pool"""
+        import io
+
+        async def scenario():
+            async with AsyncMasker(max_workers=1) as masker:
+                with pytest.raises(TypeError):
+                    masker.submit('in.pdf', io.BytesIO())
+                with pytest.raises(TypeError):
+                    masker.submit('in.pdf', 'out.pdf', audit_log=io.StringIO())
+
+        run(scenario())
+
+    @pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                        reason="worker processes must inherit the patched mask_document")
+    def test_stuck_job_is_killed(self):
+        """A job that never returns is killed and frees its slot"""
+        async def scenario():
+            with patch('async_masker.mask_document', side_effect=hang_or_mask):
+                async with AsyncMasker(max_workers=1) as masker:
+                    stuck = masker.submit('hang.pdf', timeout=0.2)
+                    queued = masker.submit('in.pdf', timeout=2)
+                    with pytest.raises(MaskingTimeoutError):
+                        await stuck
+                    return await asyncio.wait_for(queued, 3)
+
+        assert run(scenario()).output_bytes == b'%PDF'
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,189 @@
+"""
+Tests for the SQLite-backed distributed batch queue
+"""
+
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_queue import DONE, FAILED, PENDING, RUNNING, JobQueue, _LeaseHeartbeat, run_worker, run_workers
+
+
+class TestJobQueue:
+    """Test cases for job claiming, retries and leases"""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "jobs.db")
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_claim_is_exclusive(self):
+        """A claimed job is not handed to a second worker"""
+        queue = JobQueue(self.db_path)
+        queue.enqueue("a.pdf", "a_masked.pdf", {'mask_email': True})
+        other = JobQueue(self.db_path)
+
+        job = queue.claim("w1")
+        assert job.pdf_path == "a.pdf"
+        assert job.options == {'mask_email': True}
+        assert other.claim("w2") is None
+        assert queue.progress()[RUNNING] == 1
+
+        queue.complete(job, "w1", {'pages': 1})
+        assert queue.progress()[DONE] == 1
+
+    def test_failures_are_retried_then_failed(self):
+        """Failed jobs return to the queue until max_attempts"""
+        queue = JobQueue(self.db_path, max_attempts=2)
+        queue.enqueue("a.pdf", "a_masked.pdf")
+
+        queue.fail(queue.claim("w1"), "w1", "boom")
+        assert queue.progress()[PENDING] == 1
+
+        job = queue.claim("w1")
+        assert job.attempts == 2
+        queue.fail(job, "w1", "boom")
+        assert queue.progress()[FAILED] == 1
+        assert queue.claim("w1") is None
+
+    def test_expired_lease_is_reclaimed(self):
+        """A job abandoned by a dead worker is handed out again"""
+        queue = JobQueue(self.db_path, lease_seconds=-1)
+        queue.enqueue("a.pdf", "a_masked.pdf")
+
+        stale = queue.claim("dead")
+        job = queue.claim("w2")
+        assert job.job_id == stale.job_id
+
+        queue.complete(stale, "dead")
+        assert queue.progress()[RUNNING] == 1
+        queue.complete(job, "w2")
+        assert queue.progress()[DONE] == 1
+
+    def test_run_worker_drains_queue(self):
+        """run_worker masks every job and records failures"""
+        queue = JobQueue(self.db_path, max_attempts=1)
+        queue.enqueue("good.pdf", os.path.join(self.temp_dir, "out", "good.pdf"))
+        queue.enqueue("bad.pdf", os.path.join(self.temp_dir, "out", "bad.pdf"))
+
+        def fake_mask(pdf_path, output_path, **options):
+            if pdf_path == "bad.pdf":
+                raise FileNotFoundError(pdf_path)
+            with open(output_path, 'wb') as f:
+                f.write(b"%PDF")
+            return MagicMock(stats={'pages': 1})
+
+        with patch('batch_queue.mask_document', side_effect=fake_mask):
+            completed = run_worker(self.db_path, worker_id="w1", poll_interval=0, max_attempts=1)
+
+        assert completed == 1
+        assert queue.progress() == {PENDING: 0, RUNNING: 0, DONE: 1, FAILED: 1}
+        assert os.listdir(os.path.join(self.temp_dir, "out")) == ["good.pdf"]
+
+    def test_lease_is_renewed_while_masking(self):
+        """A long-running job is not handed to a second worker"""
+        queue = JobQueue(self.db_path, lease_seconds=0.3)
+        queue.enqueue("slow.pdf", os.path.join(self.temp_dir, "slow_masked.pdf"))
+        stolen = []
+
+        def fake_mask(pdf_path, output_path, **options):
+            for _ in range(5):
+                time.sleep(0.2)
+                stolen.append(queue.claim("w2"))
+            with open(output_path, 'wb') as f:
+                f.write(b"%PDF")
+            return MagicMock(stats={'pages': 1})
+
+        with patch('batch_queue.mask_document', side_effect=fake_mask):
+            completed = run_worker(self.db_path, worker_id="w1", poll_interval=0, lease_seconds=0.3)
+
+        assert completed == 1
+        assert stolen == [None] * 5
+        assert queue.progress()[DONE] == 1
+
+    @pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                        reason="worker processes must inherit the patched mask_document")
+    def test_local_workers_mask_each_job_once(self):
+        """Several worker processes drain the queue without duplicates"""
+        queue = JobQueue(self.db_path)
+        out_dir = os.path.join(self.temp_dir, "out")
+        pdfs = [f"doc{i}.pdf" for i in range(200)]
+        queue.enqueue_many([(pdf, os.path.join(out_dir, pdf), None) for pdf in pdfs])
+        masked_log = os.path.join(self.temp_dir, "masked.log")
+
+        def fake_mask(pdf_path, output_path, **options):
+            with open(masked_log, 'a') as f:
+                f.write(pdf_path + "\n")
+            with open(output_path, 'wb') as f:
+                f.write(b"%PDF")
+            return MagicMock(stats={'pages': 1})
+
+        with patch('batch_queue.mask_document', side_effect=fake_mask):
+            run_workers(self.db_path, 6, poll_interval=0.01)
+
+        with open(masked_log) as f:
+            assert sorted(f.read().split()) == sorted(pdfs)
+        assert sorted(os.listdir(out_dir)) == sorted(pdfs)
+        assert queue.progress() == {PENDING: 0, RUNNING: 0, DONE: 200, FAILED: 0}
+
+    def test_heartbeat_survives_locked_database(self):
+        """A busy database does not stop lease renewal"""
+        queue = JobQueue(self.db_path, lease_seconds=0.3)
+        queue.enqueue("a.pdf", "a_masked.pdf")
+        job = queue.claim("w1")
+        calls = []
+
+        def flaky_renew(self, job, worker_id):
+            calls.append(worker_id)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return len(calls) < 3
+
+        with patch.object(JobQueue, 'renew', flaky_renew):
+            heartbeat = _LeaseHeartbeat(self.db_path, job, "w1", 0.3)
+            heartbeat.start()
+            heartbeat.join(2)
+
+        assert not heartbeat.is_alive()
+        assert len(calls) == 3
+
+    def test_colliding_output_paths_are_rejected(self):
+        """Two jobs may not write the same output file"""
+        queue = JobQueue(self.db_path)
+        queue.enqueue("a/x.pdf", "out/x_masked.pdf")
+
+        with pytest.raises(ValueError):
+            queue.enqueue("b/x.pdf", "out/x_masked.pdf")
+        with pytest.raises(ValueError):
+            queue.enqueue_many([("c/y.pdf", "out/y_masked.pdf", None), ("d/y.pdf", "out/y_masked.pdf", None)])
+        assert sum(queue.progress().values()) == 1
+
+    def test_finished_jobs_do_not_block_output_paths(self):
+        """Done and failed jobs can be enqueued again or retried"""
+        queue = JobQueue(self.db_path, max_attempts=1)
+        queue.enqueue("a.pdf", "out/a_masked.pdf")
+        queue.enqueue("b.pdf", "out/b_masked.pdf")
+        first, second = queue.claim("w1"), queue.claim("w1")
+        queue.complete(first, "w1")
+        queue.fail(second, "w1", "share unavailable")
+
+        queue.enqueue("a.pdf", "out/a_masked.pdf")
+        assert queue.retry_failed() == 1
+        assert queue.progress() == {PENDING: 2, RUNNING: 0, DONE: 1, FAILED: 0}
+        retried = queue.claim("w1")
+        assert (retried.pdf_path, retried.attempts) == ("b.pdf", 1)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,124 @@
+"""
+Tests for the mask_document / detect_document core API
+"""
+
+import io
+import json
+import tempfile
+
+import fitz  # PyMuPDF
+import pytest
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masking import detect_document, mask_document
+
+AUDIT_KEY = b"test-audit-key"
+
+
+def make_pdf_bytes(text="Email: john.doe@example.com", pages=1):
+    """Build a small in-memory PDF with ``text`` on every page"""
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page().insert_text((50, 50), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class TestInMemoryMasking:
+    """Test bytes-in/bytes-out masking without temporary files"""
+
+    def test_bytes_in_bytes_out(self):
+        """Masking from a memoryview returns the masked document as bytes"""
+        result = mask_document(
+            memoryview(make_pdf_bytes()),
+            mask_email=True,
+            style_black=True,
+            save_options={'garbage': 3, 'deflate': True}
+        )
+
+        assert result.output_path is None
+        assert result.stats['matches'] == 1
+        masked = fitz.open(stream=result.output_bytes, filetype="pdf")
+        assert "john.doe@example.com" not in masked[0].get_text()
+        masked.close()
+
+    def test_write_to_file_like(self):
+        """Masked output can be written to a file-like object"""
+        buffer = io.BytesIO()
+        result = mask_document(make_pdf_bytes(), buffer, mask_email=True, style_black=True)
+
+        assert result.output_bytes is None
+        assert buffer.getvalue().startswith(b"%PDF")
+
+
+
+class TestAuditLog:
+    """Test the JSONL redaction audit log"""
+
+    def test_audit_log_is_hashed_jsonl(self):
+        """The audit log holds one JSON line per redaction and no plaintext"""
+        audit = io.StringIO()
+        mask_document(make_pdf_bytes(), mask_email=True, style_black=True, audit_log=audit,
+                      audit_key=AUDIT_KEY)
+
+        lines = audit.getvalue().splitlines()
+        assert len(lines) == 1
+        record = json.loads(lines[0])
+        assert record['page'] == 0
+        assert record['entity'] == 'EMAIL'
+        assert record['detector'] == 'regex'
+        assert record['action'] == 'blackout'
+        assert len(record['rect']) == 4
+        assert "john.doe@example.com" not in lines[0]
+
+    def test_audit_log_requires_key(self):
+        """Unkeyed hashes of low-entropy values are refused"""
+        with pytest.raises(ValueError):
+            mask_document(make_pdf_bytes(), mask_email=True, style_black=True, audit_log=io.StringIO())
+
+    def test_records_action_when_text_is_kept(self):
+        """Frame style is logged as such, since it does not remove text"""
+        audit = io.StringIO()
+        mask_document(make_pdf_bytes(), mask_email=True, style_frame=True, audit_log=audit,
+                      audit_key=AUDIT_KEY)
+
+        assert json.loads(audit.getvalue())['action'] == 'frame'
+
+    def test_nothing_logged_when_save_fails(self):
+        """No records are written for a document that was never saved"""
+        audit = io.StringIO()
+        missing_dir = os.path.join(tempfile.mkdtemp(), "missing", "out.pdf")
+
+        with pytest.raises(Exception):
+            mask_document(make_pdf_bytes(), missing_dir, mask_email=True,
+                          style_black=True, audit_log=audit, audit_key=AUDIT_KEY)
+
+        assert audit.getvalue() == ""
+
+
+
+class TestDetectDocument:
+    """Test the detection-only triage mode"""
+
+    def test_detect_only_stops_early(self):
+        """Detection-only mode reports matches and stops at the threshold"""
+        data = make_pdf_bytes("a@example.com b@example.com", pages=3)
+
+        result = detect_document(data, mask_email=True, stop_after={'EMAIL': 1})
+
+        assert result.stopped_early
+        assert len(result.matches) == 1
+        assert result.pages == [{'page': 0, 'entities': {'EMAIL': 1}}]
+
+        full = detect_document(data, mask_email=True)
+        assert not full.stopped_early
+        assert full.stats['pages_scanned'] == 3
+        assert full.stats['entities'] == {'EMAIL': 6}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
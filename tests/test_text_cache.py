@@ -0,0 +1,85 @@
+"""
+Tests for the memory-mapped page text cache
+"""
+
+import os
+import shutil
+import tempfile
+
+import fitz  # PyMuPDF
+import pytest
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from masking import detect_document, page_spans
+from text_cache import PageTextCache, document_key
+
+
+class TestPageTextCache:
+    """Test cases for PageTextCache"""
+
+    def setup_method(self):
+        self.cache_dir = tempfile.mkdtemp()
+        doc = fitz.open()
+        doc.new_page().insert_text((50, 50), "Email: john.doe@example.com")
+        doc.new_page()
+        doc.new_page().insert_text((50, 80), "Second: jane@example.org")
+        self.pdf_bytes = doc.tobytes()
+        doc.close()
+
+    def teardown_method(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_round_trip_matches_extraction(self):
+        """Cached spans equal freshly extracted spans"""
+        cache = PageTextCache(self.cache_dir)
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+
+        with cache.open(self.pdf_bytes, doc) as cached:
+            assert len(cached) == len(doc)
+            for page_num in range(len(doc)):
+                expected = list(page_spans(doc[page_num]))
+                actual = list(cached.page_spans(page_num))
+                assert [text for text, _ in actual] == [text for text, _ in expected]
+                for (_, bbox), (_, ref) in zip(actual, expected):
+                    assert bbox == pytest.approx(tuple(ref), abs=1e-3)
+        doc.close()
+
+        key = document_key(self.pdf_bytes)
+        assert os.path.exists(cache.path_for(key))
+
+    def test_detection_uses_cache(self):
+        """Detection results are identical with and without the cache"""
+        cache = PageTextCache(self.cache_dir)
+
+        plain = detect_document(self.pdf_bytes, mask_email=True, hash_key=b"k")
+        first = detect_document(self.pdf_bytes, mask_email=True, text_cache=cache)
+        second = detect_document(self.pdf_bytes, mask_email=True, hash_key=b"k", text_cache=cache)
+
+        assert plain.stats['entities'] == first.stats['entities'] == second.stats['entities'] == {'EMAIL': 2}
+        assert [m.value_hash for m in plain.matches] == [m.value_hash for m in second.matches]
+
+    @pytest.mark.parametrize("contents", [b"", b"NDPTXT1\0", None])
+    def test_broken_entry_is_rebuilt(self, contents):
+        """Empty, truncated or corrupt cache files are rebuilt"""
+        cache = PageTextCache(self.cache_dir)
+        path = cache.path_for(document_key(self.pdf_bytes))
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+
+        if contents is None:
+            # Cut a valid cache file short
+            cache.open(self.pdf_bytes, doc).close()
+            with open(path, 'rb') as f:
+                contents = f.read()[:-5]
+        with open(path, 'wb') as f:
+            f.write(contents)
+
+        with cache.open(self.pdf_bytes, doc) as cached:
+            assert len(cached) == len(doc)
+            assert [text for text, _ in cached.page_spans(0)] == [text for text, _ in page_spans(doc[0])]
+        doc.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,172 @@
+"""
+Persistent, memory-mapped page text index for NeuraDocPrivacy.
+
+Re-scanning the same archive with new detection rules spends much of its
+time in ``page.get_text("dict")``.  :class:`PageTextCache` stores every
+page's spans and bounding boxes once, keyed by the SHA-256 of the document,
+in a flat array-backed file that later runs memory-map instead of parsing.
+
+File layout (native byte order)::
+
+    magic            8 bytes   b'NDPTXT1\\0'
+    page_count       uint32
+    span_count       uint32
+    page_index       uint32[page_count + 1]   first span of each page
+    text_offsets     uint32[span_count + 1]   byte offsets into text blob
+    bboxes           float32[span_count * 4]
+    text             utf-8 blob
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from masking import page_spans
+
+MAGIC = b'NDPTXT1\0'
+_HEADER = struct.Struct('=8sII')
+_CHUNK_SIZE = 1 << 20
+
+
+def document_key(source):
+    """Return the SHA-256 hex digest of a document path or its bytes."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CachedDocument:
+    """Read-only view over a cached document's page text.
+
+    Arrays are memoryviews into the mapped file, so loading copies nothing;
+    only the text of a span is decoded when it is requested.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{path} is truncated")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        self._views = [view]
+        try:
+            magic, self.page_count, span_count = _HEADER.unpack_from(view)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a page text cache file")
+            text_start = _HEADER.size + (self.page_count + 1) * 4 + (span_count + 1) * 4 + span_count * 16
+            if size < text_start:
+                raise ValueError(f"{path} is truncated")
+
+            offset = _HEADER.size
+            size = (self.page_count + 1) * 4
+            self._page_index = self._slice(view, offset, size, 'I')
+            offset += size
+            size = (span_count + 1) * 4
+            self._text_offsets = self._slice(view, offset, size, 'I')
+            offset += size
+            size = span_count * 16
+            self._bboxes = self._slice(view, offset, size, 'f')
+            self._text = self._slice(view, text_start, len(view) - text_start)
+
+            # Yarım yazılmış ya da bozuk dosyaları yapısal olarak da doğrula
+            if (self._page_index[self.page_count] != span_count
+                    or self._text_offsets[span_count] != len(self._text)):
+                raise ValueError(f"{path} is corrupt")
+        except Exception:
+            self.close()
+            raise
+
+    def _slice(self, view, offset, size, fmt=None):
+        part = view[offset:offset + size]
+        self._views.append(part)
+        if fmt is not None:
+            part = part.cast(fmt)
+            self._views.append(part)
+        return part
+
+    def __len__(self):
+        return self.page_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def page_spans(self, page_num):
+        """Yield ``(text, bbox)`` for each text span on ``page_num``."""
+        for i in range(self._page_index[page_num], self._page_index[page_num + 1]):
+            text = str(self._text[self._text_offsets[i]:self._text_offsets[i + 1]], 'utf-8')
+            yield text, tuple(self._bboxes[i * 4:i * 4 + 4])
+
+    def close(self):
+        # Türetilmiş görünümler mmap kapatılmadan önce serbest bırakılmalı
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+
+class PageTextCache:
+    """Directory of memory-mapped page text files keyed by document hash.
+
+    Pass an instance as ``text_cache`` to :func:`masking.mask_document` or
+    :func:`masking.detect_document`.  A miss extracts every page up front;
+    files are written atomically, so several processes may share one cache
+    directory.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, key + '.spans')
+
+    def open(self, source, doc):
+        """Return a :class:`CachedDocument` for ``source``, building it from
+        the already opened ``doc`` on a cache miss.  Empty, truncated or
+        corrupt entries are treated as misses and rebuilt."""
+        path = self.path_for(document_key(source))
+        if os.path.exists(path):
+            try:
+                return CachedDocument(path)
+            except ValueError:
+                pass  # boş ya da bozuk kayıt; yeniden oluştur
+        self._write(path, doc)
+        return CachedDocument(path)
+
+    def _write(self, path, doc):
+        page_index = array('I', [0])
+        text_offsets = array('I', [0])
+        bboxes = array('f')
+        text = bytearray()
+
+        for page_num in range(len(doc)):
+            for span_text, span_bbox in page_spans(doc[page_num]):
+                text += span_text.encode('utf-8')
+                text_offsets.append(len(text))
+                bboxes.extend(span_bbox)
+            page_index.append(len(text_offsets) - 1)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, len(doc), len(text_offsets) - 1))
+                page_index.tofile(f)
+                text_offsets.tofile(f)
+                bboxes.tofile(f)
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise